@@ -1,16 +1,16 @@
 import asyncio
+import collections
 import datetime
+import itertools
 import logging
 import logging.handlers
 import os
 import pprint
-import queue
 import re
 import socket
 import sys
 import time
 import traceback
-import urllib.parse
 
 from .config import Config
 from .timer import Timer
@@ -19,6 +19,53 @@ from .timer import Timer
 LOG_NOTICE = 25
 logging.addLevelName(LOG_NOTICE, "NOTICE")
 
+# Schemes of the `logging:syslog` address and their socket family and type
+_SYSLOG_SCHEMES = {
+	'tcp': (socket.AF_INET, socket.SOCK_STREAM),
+	'udp': (socket.AF_INET, socket.SOCK_DGRAM),
+	'unix-connect': (socket.AF_UNIX, socket.SOCK_STREAM),
+	'unix-sendto': (socket.AF_UNIX, socket.SOCK_DGRAM),
+}
+
+
+def _compute_syslog_severity(levelno):
+	if levelno <= logging.DEBUG:
+		return 7  # Debug
+	elif levelno <= logging.INFO:
+		return 6  # Informational
+	elif levelno <= LOG_NOTICE:
+		return 5  # Notice
+	elif levelno <= logging.WARNING:
+		return 4  # Warning
+	elif levelno <= logging.ERROR:
+		return 3  # Error
+	elif levelno <= logging.CRITICAL:
+		return 2  # Critical
+	else:
+		return 1  # Alert
+
+
+# Syslog severity indexed by a logging level number
+_SEVERITY_BY_LEVELNO = tuple(_compute_syslog_severity(levelno) for levelno in range(logging.CRITICAL + 1))
+
+
+def _syslog_severity(levelno):
+	'''
+	Return the syslog severity of the logging level number.
+	'''
+	if levelno >= len(_SEVERITY_BY_LEVELNO):
+		return 1  # Alert
+	if levelno < 0:
+		return 7  # Debug
+	return _SEVERITY_BY_LEVELNO[levelno]
+
+
+# Maximum number of buffers passed to a single sendmsg() call
+try:
+	_IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+	_IOV_MAX = 16
+
 
 class Logging(object):
 
@@ -97,27 +144,28 @@ class Logging(object):
 					self.SyslogHandler = AsyncIOHandler(app.Loop, socket.AF_UNIX, socket.SOCK_DGRAM, address)
 
 				else:
-					url = urllib.parse.urlparse(address)
-
-					if url.scheme == 'tcp':
-						self.SyslogHandler = AsyncIOHandler(app.Loop, socket.AF_INET, socket.SOCK_STREAM, (
-							url.hostname if url.hostname is not None else 'localhost',
-							url.port if url.port is not None else logging.handlers.SYSLOG_UDP_PORT
-						))
-
-					elif url.scheme == 'udp':
-						self.SyslogHandler = AsyncIOHandler(app.Loop, socket.AF_INET, socket.SOCK_DGRAM, (
-							url.hostname if url.hostname is not None else 'localhost',
-							url.port if url.port is not None else logging.handlers.SYSLOG_UDP_PORT
-						))
-
-					elif url.scheme == 'unix-connect':
-						self.SyslogHandler = AsyncIOHandler(app.Loop, socket.AF_UNIX, socket.SOCK_STREAM, url.path)
-
-					elif url.scheme == 'unix-sendto':
-						self.SyslogHandler = AsyncIOHandler(app.Loop, socket.AF_UNIX, socket.SOCK_DGRAM, url.path)
+					scheme, _, rest = address.partition('://')
+					family_type = _SYSLOG_SCHEMES.get(scheme.lower())
+					# Drop a fragment and a query, split a network location and a path
+					netloc, sep, path = rest.partition('#')[0].partition('?')[0].partition('/')
+
+					if family_type is not None and family_type[0] == socket.AF_UNIX:
+						self.SyslogHandler = AsyncIOHandler(app.Loop, family_type[0], family_type[1], sep + path)
+
+					elif family_type is not None:
+						# Drop a userinfo
+						host, _, port = netloc.rpartition('@')[2].partition(':')
+						try:
+							port = int(port) if len(port) > 0 else logging.handlers.SYSLOG_UDP_PORT
+						except ValueError:
+							family_type = None
+						else:
+							self.SyslogHandler = AsyncIOHandler(app.Loop, family_type[0], family_type[1], (
+								host if len(host) > 0 else 'localhost',
+								port
+							))
 
-					else:
+					if family_type is None:
 						self.RootLogger.warning("Invalid logging:syslog address '{}'".format(address))
 						address = None
 
@@ -187,10 +235,20 @@ class StructuredDataFormatter(logging.Formatter):
 
 	empty_sd = ""
 
+	# Syslog formatters provide `syslog_header(record, priority, asctime)` and `syslog_trailer`
+	syslog_header = None
+	syslog_trailer = ""
+
 	def __init__(self, facility=16, fmt=None, datefmt=None, style='%', sd_id='sd'):
 		super().__init__(fmt, datefmt, style)
 		self.SD_id = sd_id
 		self.Facility = facility
+		self.PriorityBase = facility << 3
+
+		# The time is rendered once per second, only the sub-second part is rendered per record
+		self._last_sec = None
+		self._last_datefmt = None
+		self._last_sec_parts = None
 
 
 	def format(self, record):
@@ -198,24 +256,41 @@ class StructuredDataFormatter(logging.Formatter):
 		Format the specified record as text.
 		'''
 
+		if self.syslog_header is not None:
+			# The syslog line is built directly, without the generic ``logging.Formatter`` machinery
+			header = self.syslog_header(record, self.priority(record), self.formatTime(record, self.datefmt))
+			struct_data = self.render_struct_data(record.__dict__.get("_struct_data"))
+			return f"{header}{struct_data}{self.format_message(record)}{self.syslog_trailer}"
+
 		record.struct_data = self.render_struct_data(record.__dict__.get("_struct_data"))
+		record.priority = self.priority(record)
+		return super().format(record)
+
+
+	def priority(self, record):
+		'''
+		Return the syslog priority of the specified LogRecord.
+		'''
 
 		# The Priority value is calculated by first multiplying the Facility number by 8 and then adding the numerical value of the Severity.
-		if record.levelno > logging.DEBUG and record.levelno <= logging.INFO:
-			severity = 6  # Informational
-		elif record.levelno <= LOG_NOTICE:
-			severity = 5  # Notice
-		elif record.levelno <= logging.WARNING:
-			severity = 4  # Warning
-		elif record.levelno <= logging.ERROR:
-			severity = 3  # Error
-		elif record.levelno <= logging.CRITICAL:
-			severity = 2  # Critical
-		else:
-			severity = 1  # Alert
+		return self.PriorityBase + _syslog_severity(record.levelno)
 
-		record.priority = (self.Facility << 3) + severity
-		return super().format(record)
+
+	def format_message(self, record):
+		'''
+		Return the message of the specified LogRecord, including an exception and a stack information if present.
+		'''
+
+		message = record.message = record.getMessage()
+
+		if record.exc_info and not record.exc_text:
+			record.exc_text = self.formatException(record.exc_info)
+		if record.exc_text:
+			message = message + '\n' + record.exc_text
+		if record.stack_info:
+			message = message + '\n' + self.formatStack(record.stack_info)
+
+		return message
 
 
 	def formatTime(self, record, datefmt=None):
@@ -224,16 +299,47 @@ class StructuredDataFormatter(logging.Formatter):
 		'''
 
 		try:
-			ct = datetime.datetime.fromtimestamp(record.created)
-			if datefmt is not None:
-				s = ct.strftime(datefmt)
-			else:
-				t = ct.strftime("%Y-%m-%d %H:%M:%S")
-				s = "%s.%03d" % (t, record.msecs)
-			return s
+			sec = int(record.created)
+			parts = self._render_second(sec, datefmt)
+			if parts is None:
+				usec = min(round((record.created - sec) * 1000000), 999999)
+				return datetime.datetime(*self.converter(sec)[:6], microsecond=usec).strftime(datefmt)
+
+			head, tail = parts
+			if datefmt is None:
+				ms = int((record.created - sec) * 1000)
+				return f"{head}.{ms:03d}"
+			if tail is None:
+				return head
+			usec = min(round((record.created - sec) * 1000000), 999999)
+			return f"{head}{usec:06d}{tail}"
+
 		except BaseException as e:
 			print("ERROR when logging: {}".format(e), file=sys.stderr)
-			return str(ct)
+			return str(record.created)
+
+
+	def _render_second(self, sec, datefmt):
+		'''
+		Return the time parts (before and after the sub-second part) of the given second, cached until the second changes.
+		Return None if the date format cannot be split this way (an escaped ``%%`` or more than one ``%f``).
+		'''
+
+		if sec != self._last_sec or datefmt != self._last_datefmt:
+			ct = self.converter(sec)
+			if datefmt is None:
+				self._last_sec_parts = (time.strftime("%Y-%m-%d %H:%M:%S", ct), None)
+			elif '%%' in datefmt or datefmt.count('%f') > 1:
+				self._last_sec_parts = None
+			else:
+				# The `%f` (microseconds) is not supported by time.strftime(), it is rendered per record
+				head, sep, tail = datefmt.partition('%f')
+				self._last_sec_parts = (time.strftime(head, ct), time.strftime(tail, ct) if sep else None)
+			self._last_sec = sec
+			self._last_datefmt = datefmt
+
+		return self._last_sec_parts
+
 
 	def render_struct_data(self, struct_data):
 		'''
@@ -277,14 +383,16 @@ class MacOSXSyslogFormatter(StructuredDataFormatter):
 	It implements Syslog formatting for Mac OSX syslog (aka format ``m``).
 	"""
 
+	syslog_trailer = "\000"
+
 	def __init__(self, fmt=None, datefmt=None, style='%', sd_id='sd'):
-		fmt = '<%(priority)s>%(asctime)s {app_name}[{proc_id}]: %(levelname)s %(name)s %(struct_data)s%(message)s\000'.format(
-			app_name=Config["logging"]["app_name"],
-			proc_id=os.getpid(),
-		)
+		super().__init__(datefmt='%b %d %H:%M:%S', style=style, sd_id=sd_id)
+		self.AppName = Config["logging"]["app_name"]
+		self.ProcId = os.getpid()
+
 
-		# Initialize formatter
-		super().__init__(fmt=fmt, datefmt='%b %d %H:%M:%S', style=style, sd_id=sd_id)
+	def syslog_header(self, record, priority, asctime):
+		return f"<{priority}>{asctime} {self.AppName}[{self.ProcId}]: {record.levelname} {record.name} "
 
 
 class SyslogRFC3164Formatter(StructuredDataFormatter):
@@ -292,15 +400,16 @@ class SyslogRFC3164Formatter(StructuredDataFormatter):
 	It implements Syslog formatting for Mac OSX syslog (aka format ``3``).
 	"""
 
+	syslog_trailer = "\000"
+
 	def __init__(self, fmt=None, datefmt=None, style='%', sd_id='sd'):
-		fmt = '<%(priority)s>%(asctime)s {app_name} {proc_id} %(levelname)s %(name)s %(struct_data)s%(message)s\000'.format(
-			app_name=Config["logging"]["app_name"],
-			hostname=socket.gethostname(),
-			proc_id=os.getpid(),
-		)
+		super().__init__(datefmt='%b %d %H:%M:%S', style=style, sd_id=sd_id)
+		self.AppName = Config["logging"]["app_name"]
+		self.ProcId = os.getpid()
+
 
-		# Initialize formatter
-		super().__init__(fmt=fmt, datefmt='%b %d %H:%M:%S', style=style, sd_id=sd_id)
+	def syslog_header(self, record, priority, asctime):
+		return f"<{priority}>{asctime} {self.AppName} {self.ProcId} {record.levelname} {record.name} "
 
 
 class SyslogRFC5424Formatter(StructuredDataFormatter):
@@ -311,24 +420,26 @@ class SyslogRFC5424Formatter(StructuredDataFormatter):
 	empty_sd = " "
 
 	def __init__(self, fmt=None, datefmt=None, style='%', sd_id='sd'):
-		fmt = '<%(priority)s>1 %(asctime)s.%(msecs)dZ {hostname} {app_name} {proc_id} %(name)s [log l="%(levelname)s"]%(struct_data)s%(message)s'.format(
-			app_name=Config["logging"]["app_name"],
-			hostname=socket.gethostname(),
-			proc_id=os.getpid(),
-		)
-
-		# Initialize formatter
-		super().__init__(fmt=fmt, datefmt='%Y-%m-%dT%H:%M:%S', style=style, sd_id=sd_id)
+		super().__init__(datefmt='%Y-%m-%dT%H:%M:%S', style=style, sd_id=sd_id)
+		self.AppName = Config["logging"]["app_name"]
+		self.Hostname = socket.gethostname()
+		self.ProcId = os.getpid()
 
 		# Convert time to GMT
 		self.converter = time.gmtime
 
 
+	def syslog_header(self, record, priority, asctime):
+		msecs = int((record.created - int(record.created)) * 1000)
+		return f"<{priority}>1 {asctime}.{msecs:03d}Z {self.Hostname} {self.AppName} {self.ProcId} {record.name} [log l=\"{record.levelname}\"]"
+
+
 class AsyncIOHandler(logging.Handler):
 
 	'''
 A logging handler similar to a standard ``logging.handlers.SocketHandler`` that utilizes ``asyncio``.
 It implements a queue for decoupling logging from a networking. The networking is fully event-driven via ``asyncio`` mechanisms.
+For stream sockets, log entries are buffered and written with a single scatter-gather ``sendmsg()`` per loop iteration.
 	'''
 
 	def __init__(self, loop, family, sock_type, address, facility=logging.handlers.SysLogHandler.LOG_LOCAL1):
@@ -342,7 +453,8 @@ It implements a queue for decoupling logging from a networking. The networking i
 		self._socket = None
 		self._reset()
 
-		self._queue = queue.Queue()
+		self._queue = collections.deque()
+		self._flush_scheduled = False
 
 		self._loop.call_soon(self._connect, self._loop)
 
@@ -374,11 +486,76 @@ It implements a queue for decoupling logging from a networking. The networking i
 	def _on_write(self):
 		self._write_ready = True
 		self._loop.remove_writer(self._socket)
+		self._flush()
+
+
+	def _flush(self):
+		self._flush_scheduled = False
+		if not self._write_ready:
+			return
+
+		if self._type != socket.SOCK_STREAM:
+			# Datagram sockets must preserve boundaries of log entries, send them one by one
+			while len(self._queue) > 0:
+				try:
+					self._socket.send(self._queue[0])
+				except (BlockingIOError, InterruptedError):
+					self._write_ready = False
+					self._loop.add_writer(self._socket, self._on_write)
+					return
+				except Exception as e:
+					print("Error when writing to syslog '{}'".format(self._address), e, file=sys.stderr)
+				self._queue.popleft()
+			return
+
+		while len(self._queue) > 0:
+			try:
+				sent = self._socket.sendmsg(itertools.islice(self._queue, _IOV_MAX))
+			except (BlockingIOError, InterruptedError):
+				sent = 0
+			except Exception as e:
+				print("Error when writing to syslog '{}'".format(self._address), e, file=sys.stderr)
+				return
+
+			if sent == 0:
+				# The socket is full, wait till it becomes writable again
+				self._write_ready = False
+				self._loop.add_writer(self._socket, self._on_write)
+				return
+
+			# Drop fully sent entries, keep the unsent tail of a partially sent one
+			while sent > 0:
+				msg = self._queue[0]
+				if len(msg) <= sent:
+					self._queue.popleft()
+					sent -= len(msg)
+				else:
+					self._queue[0] = memoryview(msg)[sent:]
+					sent = 0
 
-		while not self._queue.empty():
-			# TODO: Handle eventual error in writing -> break the cycle and restart on write handler
-			msg = self._queue.get_nowait()
-			self._socket.sendall(msg)
+
+	def _drain(self):
+		'''
+		Write all queued log entries synchronously, used when the event loop cannot do that.
+		'''
+		if self._socket is None:
+			return
+
+		while len(self._queue) > 0:
+			msg = self._queue.popleft()
+			try:
+				self._socket.sendall(msg)
+			except Exception as e:
+				print("Error when writing to syslog '{}'".format(self._address), e, file=sys.stderr)
+
+
+	def flush(self):
+		self._drain()
+
+
+	def close(self):
+		self._drain()
+		super().close()
 
 
 	def _on_read(self):
@@ -399,22 +576,24 @@ It implements a queue for decoupling logging from a networking. The networking i
 		'''
 		try:
 			msg = self.format(record).encode('utf-8')
+			self._queue.append(msg)
 
-			if self._write_ready:
-				try:
-					self._socket.sendall(msg)
-				except Exception as e:
-					print("Error when writing to syslog '{}'".format(self._address), e, file=sys.stderr)
-					self._enqueue(msg)
-
-			else:
-				self._enqueue(record)
+			if not self._loop.is_running():
+				# The event loop is stopped or closed (e.g. during the application exit), write synchronously
+				self._drain()
 
+			elif self._write_ready and not self._flush_scheduled:
+				self._flush_scheduled = True
+				try:
+					if asyncio._get_running_loop() is self._loop:
+						self._loop.call_soon(self._flush)
+					else:
+						# The emit() is called from other thread than the one of the event loop (e.g. an executor)
+						self._loop.call_soon_threadsafe(self._flush)
+				except BaseException:
+					self._flush_scheduled = False
+					raise
 
 		except Exception as e:
 			print("Error when emit to syslog '{}'".format(self._address), e, file=sys.stderr)
 			self.handleError(record)
-
-
-	def _enqueue(self, record):
-		self._queue.put(record)
@@ -1,13 +1,20 @@
 import logging
 import datetime
 import os
+import queue
 import sys
 import json
+import threading
 
-from ..log import LOG_NOTICE
+from ..log import LOG_NOTICE, _syslog_severity
 
 
 class LogmanIOLogHandler(logging.Handler):
+	'''
+	The log handler that forwards log entries to LogMan.io.
+	The ``emit()`` only collects fields of the record, the JSON serialization happens in a dedicated thread,
+	which hands the result over to the service outbound queue in the event loop.
+	'''
 
 	def __init__(self, svc, level=logging.NOTSET):
 		super().__init__(level=level)
@@ -20,26 +27,67 @@ class LogmanIOLogHandler(logging.Handler):
 		self.Hostname = svc.App.HostName
 		self.Program = os.path.basename(sys.argv[0])
 
+		self.Loop = svc.App.Loop
+		self.RawQueue = queue.Queue()
+		self.SerializerThread = threading.Thread(target=self._serializer, name="asab.logman.log", daemon=True)
+		self.SerializerThread.start()
+
+
+	def close(self):
+		if self.SerializerThread is not None:
+			self.RawQueue.put(None)
+			self.SerializerThread.join()
+			self.SerializerThread = None
+		super().close()
+
+
+	def _serializer(self):
+		while True:
+			log_entries = [self.RawQueue.get()]
+
+			# Drain the rest of the queue, so that the batch is handed over to the event loop at once
+			while True:
+				try:
+					log_entries.append(self.RawQueue.get_nowait())
+				except queue.Empty:
+					break
+
+			batch = []
+			stop = False
+			for log_entry in log_entries:
+				if log_entry is None:
+					stop = True
+					break
+				try:
+					log_entry["@timestamp"] = datetime.datetime.utcfromtimestamp(log_entry["@timestamp"]).isoformat() + 'Z'
+					batch.append(('sj', json.dumps(log_entry)))
+				except Exception as e:
+					print("Error when serializing a log entry for LogMan.io", e, file=sys.stderr)
+
+			if len(batch) > 0:
+				try:
+					self.Loop.call_soon_threadsafe(self._put_batch, batch)
+				except RuntimeError:
+					pass  # The event loop is closed
+
+			if stop:
+				return
+
+
+	def _put_batch(self, batch):
+		for item in batch:
+			self.Service.OutboundQueue.put_nowait(item)
+
 
 	def emit(self, record):
+		if record.levelno < self.level:
+			return
+
 		if record.name == 'asab.metrics.service' and record.levelno == LOG_NOTICE:
 			return  # No metrics to be submitted this way
 
-		if record.levelno > logging.DEBUG and record.levelno <= logging.INFO:
-			severity = 6  # Informational
-		elif record.levelno <= LOG_NOTICE:
-			severity = 5  # Notice
-		elif record.levelno <= logging.WARNING:
-			severity = 4  # Warning
-		elif record.levelno <= logging.ERROR:
-			severity = 3  # Error
-		elif record.levelno <= logging.CRITICAL:
-			severity = 2  # Critical
-		else:
-			severity = 1  # Alert
-
 		log_entry = {
-			"@timestamp": datetime.datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+			"@timestamp": record.created,  # Rendered by the serializer thread
 			"T": "syslog",
 			"H": self.Hostname,
 			"P": self.Program,
@@ -47,7 +95,7 @@ class LogmanIOLogHandler(logging.Handler):
 			"s": "{}:{}".format(record.funcName, record.lineno),
 			"p": record.process,
 			"Th": record.thread,
-			"l": severity,
+			"l": _syslog_severity(record.levelno),
 		}
 
 		message = record.getMessage()
@@ -66,6 +114,6 @@ class LogmanIOLogHandler(logging.Handler):
 
 		sd = record.__dict__.get("_struct_data")
 		if sd is not None:
-			log_entry['sd'] = sd
+			log_entry['sd'] = dict(sd)
 
-		self.Service.OutboundQueue.put_nowait(('sj', json.dumps(log_entry)))
+		self.RawQueue.put_nowait(log_entry)